@@ -1,6 +1,10 @@
 import ctypes                     # import the C compatible data types
 from sys import platform, path    # this is needed to check the OS type and get the PATH
 from os import sep                # OS specific file path separators
+import time                       # delays and timing of the measurements
+import numpy as np                # arrays for the waveforms and the measurements
+import matplotlib.pyplot as plt   # plotting of the results
+from matplotlib.ticker import FormatStrFormatter  # tick label format of the plots
 
 # load the dynamic library, get constants path (the path is OS specific)
 if platform.startswith("win"):
@@ -22,20 +26,81 @@ path.append(constants_path)
 
 import dwfconstants as constants
 import device
+
+# argument types of the used functions, declared once so ctypes does not have to convert every argument by guessing
+# (BOOL is an int, the handle is an int, data buffers are raw pointers)
+_signatures = {
+    "FDwfDeviceOpen": [ctypes.c_int, ctypes.POINTER(ctypes.c_int)],
+    "FDwfDeviceClose": [ctypes.c_int],
+    "FDwfAnalogInChannelEnableSet": [ctypes.c_int, ctypes.c_int, ctypes.c_int],
+    "FDwfAnalogInChannelOffsetSet": [ctypes.c_int, ctypes.c_int, ctypes.c_double],
+    "FDwfAnalogInChannelRangeSet": [ctypes.c_int, ctypes.c_int, ctypes.c_double],
+    "FDwfAnalogInChannelFilterSet": [ctypes.c_int, ctypes.c_int, ctypes.c_int],
+    "FDwfAnalogInBufferSizeSet": [ctypes.c_int, ctypes.c_int],
+    "FDwfAnalogInFrequencySet": [ctypes.c_int, ctypes.c_double],
+    "FDwfAnalogInFrequencyGet": [ctypes.c_int, ctypes.POINTER(ctypes.c_double)],
+    "FDwfAnalogInAcquisitionModeSet": [ctypes.c_int, ctypes.c_int],
+    "FDwfAnalogInRecordLengthSet": [ctypes.c_int, ctypes.c_double],
+    "FDwfAnalogInTriggerSourceSet": [ctypes.c_int, ctypes.c_ubyte],
+    "FDwfAnalogInTriggerAutoTimeoutSet": [ctypes.c_int, ctypes.c_double],
+    "FDwfAnalogInTriggerPositionSet": [ctypes.c_int, ctypes.c_double],
+    "FDwfAnalogInConfigure": [ctypes.c_int, ctypes.c_int, ctypes.c_int],
+    "FDwfAnalogInStatus": [ctypes.c_int, ctypes.c_int, ctypes.POINTER(ctypes.c_byte)],
+    "FDwfAnalogInStatusSample": [ctypes.c_int, ctypes.c_int, ctypes.POINTER(ctypes.c_double)],
+    "FDwfAnalogInStatusData": [ctypes.c_int, ctypes.c_int, ctypes.c_void_p, ctypes.c_int],
+    "FDwfAnalogInStatusRecord": [ctypes.c_int, ctypes.POINTER(ctypes.c_int), ctypes.POINTER(ctypes.c_int), ctypes.POINTER(ctypes.c_int)],
+    "FDwfAnalogInReset": [ctypes.c_int],
+    "FDwfAnalogOutNodeEnableSet": [ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_int],
+    "FDwfAnalogOutNodeFunctionSet": [ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_ubyte],
+    "FDwfAnalogOutNodeDataSet": [ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_void_p, ctypes.c_int],
+    "FDwfAnalogOutNodeFrequencySet": [ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_double],
+    "FDwfAnalogOutNodeAmplitudeSet": [ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_double],
+    "FDwfAnalogOutNodeOffsetSet": [ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_double],
+    "FDwfAnalogOutNodeSymmetrySet": [ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_double],
+    "FDwfAnalogOutRunSet": [ctypes.c_int, ctypes.c_int, ctypes.c_double],
+    "FDwfAnalogOutWaitSet": [ctypes.c_int, ctypes.c_int, ctypes.c_double],
+    "FDwfAnalogOutRepeatSet": [ctypes.c_int, ctypes.c_int, ctypes.c_int],
+    "FDwfAnalogOutConfigure": [ctypes.c_int, ctypes.c_int, ctypes.c_int],
+    "FDwfAnalogOutReset": [ctypes.c_int, ctypes.c_int],
+    "FDwfAnalogIOChannelNodeSet": [ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_double],
+    "FDwfAnalogIOEnableSet": [ctypes.c_int, ctypes.c_int],
+}
+
+def _declare_signatures(signatures):
+    """
+        set the argument and return types of the listed dwf functions
+    """
+    for name, argtypes in signatures.items():
+        getattr(dwf, name).argtypes = argtypes
+        getattr(dwf, name).restype = ctypes.c_int   # every function returns a BOOL
+    return
+
+_declare_signatures(_signatures)
  
+class DeviceData:
+    """ stores the device handle and the oscilloscope settings """
+    __slots__ = ("handle", "sampling_frequency", "buffer_size")
+
+    def __init__(self, handle, sampling_frequency=20e06, buffer_size=8192):
+        self.handle = handle
+        self.sampling_frequency = sampling_frequency
+        self.buffer_size = buffer_size
+
 def open_AD2():
     """
         open the first available device
+        (main uses device.open instead, which also checks the connection and reads the device information)
+ 
+        returns:    - device data
     """
     # this is the device handle - it will be used by all functions to "address" the connected device
     device_handle = ctypes.c_int()
 
     # connect to the first available device
-    dwf.FDwfDeviceOpen(ctypes.c_int(-1), ctypes.byref(device_handle))
-    data.handle = device_handle
-    return data
+    dwf.FDwfDeviceOpen(-1, ctypes.byref(device_handle))
+    return DeviceData(handle=device_handle)
 
-def open_oscilloscope(device_data, sampling_frequency=20e06, buffer_size=8921, offset=0, amplitude_range=50):
+def open_oscilloscope(device_data, sampling_frequency=20e06, buffer_size=8192, offset=0, amplitude_range=50):
     """
         initialize the oscilloscope
         parameters: - device data
@@ -45,24 +110,26 @@ def open_oscilloscope(device_data, sampling_frequency=20e06, buffer_size=8921, o
                     - amplitude range in Volts, default is ±5V
     """
     # enable all channels
-    dwf.FDwfAnalogInChannelEnableSet(device_data.handle, ctypes.c_int(0), ctypes.c_bool(True))
+    dwf.FDwfAnalogInChannelEnableSet(device_data.handle, 0, True)
  
     # set offset voltage (in Volts)
-    dwf.FDwfAnalogInChannelOffsetSet(device_data.handle, ctypes.c_int(0), ctypes.c_double(offset))
+    dwf.FDwfAnalogInChannelOffsetSet(device_data.handle, 0, offset)
  
     # set range (maximum signal amplitude in Volts)
-    dwf.FDwfAnalogInChannelRangeSet(device_data.handle, ctypes.c_int(0), ctypes.c_double(amplitude_range))
+    dwf.FDwfAnalogInChannelRangeSet(device_data.handle, 0, amplitude_range)
  
     # set the buffer size (data point in a recording)
-    dwf.FDwfAnalogInBufferSizeSet(device_data.handle, ctypes.c_int(buffer_size))
+    dwf.FDwfAnalogInBufferSizeSet(device_data.handle, buffer_size)
  
     # set the acquisition frequency (in Hz)
-    dwf.FDwfAnalogInFrequencySet(device_data.handle, ctypes.c_double(sampling_frequency))
+    dwf.FDwfAnalogInFrequencySet(device_data.handle, sampling_frequency)
  
     # disable averaging (for more info check the documentation)
-    dwf.FDwfAnalogInChannelFilterSet(device_data.handle, ctypes.c_int(-1), constants.filterDecimate)
-    #data.sampling_frequency = sampling_frequency
-    #data.buffer_size = buffer_size
+    dwf.FDwfAnalogInChannelFilterSet(device_data.handle, -1, constants.filterDecimate)
+ 
+    # remember the settings for the recordings
+    device_data.sampling_frequency = sampling_frequency
+    device_data.buffer_size = buffer_size
     return
 
 def measure_oscilloscope(device_data, channel):
@@ -74,14 +141,14 @@ def measure_oscilloscope(device_data, channel):
         returns:    - the measured voltage in Volts
     """
     # set up the instrument
-    dwf.FDwfAnalogInConfigure(device_data.handle, ctypes.c_bool(False), ctypes.c_bool(False))
+    dwf.FDwfAnalogInConfigure(device_data.handle, False, False)
  
     # read data to an internal buffer
-    dwf.FDwfAnalogInStatus(device_data.handle, ctypes.c_bool(False), ctypes.c_int(0))
+    dwf.FDwfAnalogInStatus(device_data.handle, False, None)
  
     # extract data from that buffer
     voltage = ctypes.c_double()   # variable to store the measured voltage
-    dwf.FDwfAnalogInStatusSample(device_data.handle, ctypes.c_int(channel - 1), ctypes.byref(voltage))
+    dwf.FDwfAnalogInStatusSample(device_data.handle, channel - 1, ctypes.byref(voltage))
  
     # store the result as float
     voltage = voltage.value
@@ -92,34 +159,143 @@ def record_oscilloscope(device_data, channel):
         record an analog signal
         parameters: - device data
                     - the selected oscilloscope channel (1-2, or 1-4)
-        returns:    - buffer - a list with the recorded voltages
-                    - time - a list with the time moments for each voltage in seconds (with the same index as "buffer")
+        returns:    - buffer - an array with the recorded voltages
+                    - time - an array with the time moments for each voltage in seconds (with the same index as "buffer")
     """
     # set up the instrument
-    dwf.FDwfAnalogInConfigure(device_data.handle, ctypes.c_bool(False), ctypes.c_bool(True))
+    dwf.FDwfAnalogInConfigure(device_data.handle, False, True)
  
-    # read data to an internal buffer
+    # read data to an internal buffer (the data is only transferred once the acquisition is done)
+    status = ctypes.c_byte()    # variable to store buffer status
+    status_pointer = ctypes.byref(status)
     while True:
-        status = ctypes.c_byte()    # variable to store buffer status
-        dwf.FDwfAnalogInStatus(device_data.handle, ctypes.c_bool(True), ctypes.byref(status))
+        dwf.FDwfAnalogInStatus(device_data.handle, True, status_pointer)
  
         # check internal buffer status
         if status.value == constants.DwfStateDone.value:
-                # exit loop when ready
-                break
+            # exit loop when ready
+            break
  
     # copy buffer
-    buffer = (ctypes.c_double * data.buffer_size)()   # create an empty buffer
-    dwf.FDwfAnalogInStatusData(device_data.handle, ctypes.c_int(channel - 1), buffer, ctypes.c_int(data.buffer_size))
+    buffer = (ctypes.c_double * device_data.buffer_size)()   # create an empty buffer
+    dwf.FDwfAnalogInStatusData(device_data.handle, channel - 1, buffer, device_data.buffer_size)
  
     # calculate aquisition time
-    time = range(0, data.buffer_size)
-    time = [moment / data.sampling_frequency for moment in time]
+    time = np.arange(device_data.buffer_size, dtype=np.float64) / device_data.sampling_frequency
  
-    # convert into list
-    buffer = [float(element) for element in buffer]
+    # convert into array (copied, so it does not depend on the ctypes buffer)
+    buffer = np.frombuffer(buffer, dtype=np.float64).copy()
     return buffer, time
 
+def start_recording(device_data, sampling_frequency, sample_count, trigger_source=constants.trigsrcNone):
+    """
+        start a record mode acquisition on both oscilloscope channels
+        parameters: - device data
+                    - sampling frequency in Hz
+                    - number of samples to record on each channel
+                    - trigger source, the recording starts on this event, default is none (start immediately)
+ 
+        returns:    - the sampling frequency set by the device in Hz (it is quantized, so it can differ from the requested one)
+ 
+        the device data keeps the settings of open_oscilloscope, read_recording restores them
+    """
+    # enable both channels
+    dwf.FDwfAnalogInChannelEnableSet(device_data.handle, 0, True)
+    dwf.FDwfAnalogInChannelEnableSet(device_data.handle, 1, True)
+ 
+    # record continuously instead of filling a single buffer
+    dwf.FDwfAnalogInAcquisitionModeSet(device_data.handle, constants.acqmodeRecord)
+ 
+    # set the acquisition frequency (in Hz) and the length of the recording (in seconds)
+    dwf.FDwfAnalogInFrequencySet(device_data.handle, sampling_frequency)
+    frequency = ctypes.c_double()
+    dwf.FDwfAnalogInFrequencyGet(device_data.handle, ctypes.byref(frequency))
+    sampling_frequency = frequency.value
+    dwf.FDwfAnalogInRecordLengthSet(device_data.handle, sample_count / sampling_frequency)
+ 
+    # wait for the trigger without timeout, no samples are kept from before the trigger
+    dwf.FDwfAnalogInTriggerSourceSet(device_data.handle, trigger_source)
+    dwf.FDwfAnalogInTriggerAutoTimeoutSet(device_data.handle, 0)
+    dwf.FDwfAnalogInTriggerPositionSet(device_data.handle, 0)
+ 
+    # start the acquisition
+    dwf.FDwfAnalogInConfigure(device_data.handle, False, True)
+    return sampling_frequency
+
+def read_recording(device_data, buffer1, buffer2, timeout=10):
+    """
+        copy the samples of a record mode acquisition
+        parameters: - device data
+                    - float64 array for the voltages of channel 1
+                    - float64 array for the voltages of channel 2, same length as the first one
+                    - timeout in seconds, the reading is abandoned after it, default is 10s
+ 
+        returns:    - the number of samples received on each channel
+ 
+        samples the device did not deliver are set to NaN, afterwards the oscilloscope
+        is set back to the single acquisitions of open_oscilloscope
+    """
+    sample_count = len(buffer1)
+    status = ctypes.c_byte()        # variable to store buffer status
+    available = ctypes.c_int()      # number of new samples
+    lost = ctypes.c_int()           # number of samples overwritten before they were read
+    corrupted = ctypes.c_int()      # number of samples which could be corrupted
+ 
+    index = 0
+    lost_count = 0
+    corrupted_count = 0
+    deadline = time.perf_counter() + timeout
+    while index < sample_count:
+        # read data to an internal buffer
+        dwf.FDwfAnalogInStatus(device_data.handle, True, ctypes.byref(status))
+        dwf.FDwfAnalogInStatusRecord(device_data.handle, ctypes.byref(available), ctypes.byref(lost), ctypes.byref(corrupted))
+        lost_count += lost.value
+        corrupted_count += corrupted.value
+ 
+        # mark the overwritten samples as missing
+        if lost.value > 0:
+            buffer1[index:index + lost.value] = np.nan
+            buffer2[index:index + lost.value] = np.nan
+            index += lost.value
+ 
+        # copy every new sample of both channels at once
+        count = min(available.value, sample_count - index)
+        if count > 0:
+            offset = index * buffer1.itemsize
+            dwf.FDwfAnalogInStatusData(device_data.handle, 0, buffer1.ctypes.data + offset, count)
+            dwf.FDwfAnalogInStatusData(device_data.handle, 1, buffer2.ctypes.data + offset, count)
+            index += count
+ 
+        # stop if the device finished without providing every sample
+        if status.value == constants.DwfStateDone.value and available.value == 0:
+            break
+ 
+        # stop waiting if the trigger never came or the device stopped responding
+        if time.perf_counter() > deadline:
+            print("Warning: the recording timed out")
+            break
+ 
+    # mark the samples which never arrived as missing
+    if index < sample_count:
+        buffer1[index:] = np.nan
+        buffer2[index:] = np.nan
+    received_count = index - lost_count
+    if received_count <= 0:
+        print("Warning: the recording is empty, no samples of the sweep arrived")
+    elif index < sample_count:
+        print("Warning: the recording ended " + str(sample_count - index) + " samples early")
+    if lost_count > 0:
+        print("Warning: " + str(lost_count) + " samples were lost during the recording")
+    if corrupted_count > 0:
+        print("Warning: " + str(corrupted_count) + " samples could be corrupted")
+ 
+    # go back to the single acquisitions of open_oscilloscope without trigger, so record_oscilloscope works again
+    dwf.FDwfAnalogInAcquisitionModeSet(device_data.handle, constants.acqmodeSingle)
+    dwf.FDwfAnalogInTriggerSourceSet(device_data.handle, constants.trigsrcNone)
+    dwf.FDwfAnalogInBufferSizeSet(device_data.handle, device_data.buffer_size)
+    dwf.FDwfAnalogInFrequencySet(device_data.handle, device_data.sampling_frequency)
+    return max(received_count, 0)
+
 def close_oscilloscope(device_data):
     """
         reset the scope
@@ -157,80 +333,68 @@ def generate_function(device_data, channel, function, offset, frequency=1e03, am
                     - data - list of voltages, used only if function=custom, default is empty
     """
     # enable channel
-    channel = ctypes.c_int(channel - 1)
-    dwf.FDwfAnalogOutNodeEnableSet(device_data.handle, channel, constants.AnalogOutNodeCarrier, ctypes.c_bool(True))
+    channel = channel - 1
+    dwf.FDwfAnalogOutNodeEnableSet(device_data.handle, channel, constants.AnalogOutNodeCarrier, True)
  
     # set function type
     dwf.FDwfAnalogOutNodeFunctionSet(device_data.handle, channel, constants.AnalogOutNodeCarrier, function)
  
     # load data if the function type is custom
     if function == constants.funcCustom:
-        data_length = len(data)
-        buffer = (ctypes.c_double * data_length)()
-        for index in range(0, len(buffer)):
-            buffer[index] = ctypes.c_double(data[index])
-        dwf.FDwfAnalogOutNodeDataSet(device_data.handle, channel, constants.AnalogOutNodeCarrier, buffer, ctypes.c_int(data_length))
+        # the device reads the samples straight from the array, "samples" keeps it alive during the call
+        samples = np.ascontiguousarray(data, dtype=np.float64)
+        dwf.FDwfAnalogOutNodeDataSet(device_data.handle, channel, constants.AnalogOutNodeCarrier, samples.ctypes.data, len(samples))
  
     # set frequency
-    dwf.FDwfAnalogOutNodeFrequencySet(device_data.handle, channel, constants.AnalogOutNodeCarrier, ctypes.c_double(frequency))
+    dwf.FDwfAnalogOutNodeFrequencySet(device_data.handle, channel, constants.AnalogOutNodeCarrier, frequency)
  
     # set amplitude or DC voltage
-    dwf.FDwfAnalogOutNodeAmplitudeSet(device_data.handle, channel, constants.AnalogOutNodeCarrier, ctypes.c_double(amplitude))
+    dwf.FDwfAnalogOutNodeAmplitudeSet(device_data.handle, channel, constants.AnalogOutNodeCarrier, amplitude)
  
     # set offset
-    dwf.FDwfAnalogOutNodeOffsetSet(device_data.handle, channel, constants.AnalogOutNodeCarrier, ctypes.c_double(offset))
+    dwf.FDwfAnalogOutNodeOffsetSet(device_data.handle, channel, constants.AnalogOutNodeCarrier, offset)
  
     # set symmetry
-    dwf.FDwfAnalogOutNodeSymmetrySet(device_data.handle, channel, constants.AnalogOutNodeCarrier, ctypes.c_double(symmetry))
+    dwf.FDwfAnalogOutNodeSymmetrySet(device_data.handle, channel, constants.AnalogOutNodeCarrier, symmetry)
  
     # set running time limit
-    dwf.FDwfAnalogOutRunSet(device_data.handle, channel, ctypes.c_double(run_time))
+    dwf.FDwfAnalogOutRunSet(device_data.handle, channel, run_time)
  
     # set wait time before start
-    dwf.FDwfAnalogOutWaitSet(device_data.handle, channel, ctypes.c_double(wait))
+    dwf.FDwfAnalogOutWaitSet(device_data.handle, channel, wait)
  
     # set number of repeating cycles
-    dwf.FDwfAnalogOutRepeatSet(device_data.handle, channel, ctypes.c_int(repeat))
+    dwf.FDwfAnalogOutRepeatSet(device_data.handle, channel, repeat)
  
     # start
-    dwf.FDwfAnalogOutConfigure(device_data.handle, channel, ctypes.c_bool(True))
+    dwf.FDwfAnalogOutConfigure(device_data.handle, channel, True)
+    return
+
+def stop_function(device_data, channel=0):
+    """
+        stop a wavegen channel, or all channels (channel=0), keeping its settings
+    """
+    channel = channel - 1
+    dwf.FDwfAnalogOutConfigure(device_data.handle, channel, False)
     return
 
 def close_function(device_data, channel=0):
     """
         reset a wavegen channel, or all channels (channel=0)
     """
-    channel = ctypes.c_int(channel - 1)
+    channel = channel - 1
     dwf.FDwfAnalogOutReset(device_data.handle, channel)
     return
 
-def _switch_variable_(device_data, master_state, positive_state, negative_state, positive_voltage, negative_voltage):
+def _clamp_(value, minimum, maximum):
     """
-        turn the power supplies on/off
-        parameters: - device data
-                    - master switch - True = on, False = off
-                    - positive supply switch - True = on, False = off
-                    - negative supply switch - True = on, False = off
-                    - positive supply voltage in Volts
-                    - negative supply voltage in Volts
+        limit a value to the [minimum, maximum] interval
     """
-    # set positive voltage
-    positive_voltage = max(0, min(5, positive_voltage))
-    dwf.FDwfAnalogIOChannelNodeSet(device_data.handle, ctypes.c_int(0), ctypes.c_int(1), ctypes.c_double(positive_voltage))
- 
-    # set negative voltage
-    negative_voltage = max(-5, min(0, negative_voltage))
-    dwf.FDwfAnalogIOChannelNodeSet(device_data.handle, ctypes.c_int(1), ctypes.c_int(1), ctypes.c_double(negative_voltage))
- 
-    # enable/disable the positive supply
-    dwf.FDwfAnalogIOChannelNodeSet(device_data.handle, ctypes.c_int(0), ctypes.c_int(0), ctypes.c_int(positive_state))
- 
-    # enable the negative supply
-    dwf.FDwfAnalogIOChannelNodeSet(device_data.handle, ctypes.c_int(1), ctypes.c_int(0), ctypes.c_int(negative_state))
- 
-    # start/stop the supplies - master switch
-    dwf.FDwfAnalogIOEnableSet(device_data.handle, ctypes.c_int(master_state))
-    return
+    if value < minimum:
+        return minimum
+    if value > maximum:
+        return maximum
+    return value
 
 def _switch_variable_(device_data, master_state, positive_state, negative_state, positive_voltage, negative_voltage):
     """
@@ -243,21 +407,21 @@ def _switch_variable_(device_data, master_state, positive_state, negative_state,
                     - negative supply voltage in Volts
     """
     # set positive voltage
-    positive_voltage = max(0, min(5, positive_voltage))
-    dwf.FDwfAnalogIOChannelNodeSet(device_data.handle, ctypes.c_int(0), ctypes.c_int(1), ctypes.c_double(positive_voltage))
+    positive_voltage = _clamp_(positive_voltage, 0, 5)
+    dwf.FDwfAnalogIOChannelNodeSet(device_data.handle, 0, 1, positive_voltage)
  
     # set negative voltage
-    negative_voltage = max(-5, min(0, negative_voltage))
-    dwf.FDwfAnalogIOChannelNodeSet(device_data.handle, ctypes.c_int(1), ctypes.c_int(1), ctypes.c_double(negative_voltage))
+    negative_voltage = _clamp_(negative_voltage, -5, 0)
+    dwf.FDwfAnalogIOChannelNodeSet(device_data.handle, 1, 1, negative_voltage)
  
     # enable/disable the positive supply
-    dwf.FDwfAnalogIOChannelNodeSet(device_data.handle, ctypes.c_int(0), ctypes.c_int(0), ctypes.c_int(positive_state))
+    dwf.FDwfAnalogIOChannelNodeSet(device_data.handle, 0, 0, positive_state)
  
     # enable the negative supply
-    dwf.FDwfAnalogIOChannelNodeSet(device_data.handle, ctypes.c_int(1), ctypes.c_int(0), ctypes.c_int(negative_state))
+    dwf.FDwfAnalogIOChannelNodeSet(device_data.handle, 1, 0, negative_state)
  
     # start/stop the supplies - master switch
-    dwf.FDwfAnalogIOEnableSet(device_data.handle, ctypes.c_int(master_state))
+    dwf.FDwfAnalogIOEnableSet(device_data.handle, master_state)
     return
 
 def close(device_data):
@@ -267,121 +431,43 @@ def close(device_data):
     dwf.FDwfDeviceClose(device_data.handle)
     return
 
-def main():
-
-    ramp_measurements = []
-    opamp_measurements = []
-    Times = []
-    power_up = -5
-    amplitude = 5
-    amplitude_slope = 0.05
-    rmap_steps = int(amplitude/amplitude_slope)
-    time_per_measurement = 1e-6
-    cycles = 1
-
-    fliped = False
-
-    # connect to the device
-    device_data = device.open()
-    time.sleep(0.5)
-
-    #open_oscilloscope
-    open_oscilloscope(device_data)
-
-    _switch_variable_(device_data = device_data, master_state = True, positive_state = True, negative_state = True, positive_voltage = 5, negative_voltage = -5)
-    time.sleep(0.5)
-
-    print("starting")
-
-    # Setup function generater
-    generate_function(device_data = device_data, channel = 1, function = function.dc, offset = power_up, frequency=0, amplitude=0)
-    time.sleep(0.5)
-
-    #begin timer
-    start_time = time.time()
-
-    for j in range(0, cycles, 1):
-
-        for i in range(0, rmap_steps*2 , 1):
-            # measure oscilloscope on channel 1
-            measurement = measure_oscilloscope(device_data = device_data, channel = 1)
-            ramp_measurements.append(measurement)
-
-            """
-                make op-amp measurements for VTD
-            """
-
-            # measure oscilloscope on channel 2
-            measurement = measure_oscilloscope(device_data = device_data, channel = 2)
-            opamp_measurements.append(measurement)
-            """
-                make op-amp measurements for VTD
-            """
-
-            # increase voltage input
-            power_up += amplitude_slope
-            generate_function(device_data = device_data, channel = 1, function = function.dc, offset = power_up, frequency=0, amplitude=0)
-
-            # take time measurement
-            Times.append((time.time() - start_time))
-
-            # delay between measurements
-            time.sleep(time_per_measurement)
-
-        for i in range(0, rmap_steps*2 , 1):
-
-            # measure oscilloscope on channel 1
-            measurement = measure_oscilloscope(device_data = device_data, channel = 1)
-            ramp_measurements.append(measurement)
-
-            """
-                make op-amp measurements for VTD
-            """
-
-            # measure oscilloscope on channel 2
-            measurement = measure_oscilloscope(device_data = device_data, channel = 2)
-            opamp_measurements.append(measurement)
-
-            """
-                make op-amp measurements for VTD
-            """
-
-            # decrease voltage input
-            power_up -= amplitude_slope
-            generate_function(device_data = device_data, channel = 1, function = function.dc, offset = power_up, frequency=0, amplitude=0)
-            
-            # take time measurement
-            Times.append((time.time() - start_time))
-
-            # delay between measurements
-            time.sleep(time_per_measurement)
-
-        print(f"Cycle #{j+1} Time:{time.time() - start_time}")
+def plot_measurements(Times, ramp_measurements, opamp_measurements):
+    """
+        plot the sweep over time and the VTD of the op-amp
+        parameters: - time moments of the samples in seconds
+                    - ramp (V_in) voltages
+                    - op-amp output (V_out) voltages
+    """
+    # plot about 2000 points per line, more can not be told apart on screen and only slow down drawing
+    step = max(1, len(Times) // 2000)
 
     fig, axis = plt.subplots(2,1, figsize=(8,8))
 
     ax = axis[0]
 
-    ax.set_xlim(min(Times), max(Times))
-    ax.set_ylim(min(ramp_measurements), max(ramp_measurements))
+    # the sweep lasts well under a second, so the time axis is in milliseconds
+    ax.set_xlim(Times.min() * 1e3, Times.max() * 1e3)
+    # the limits are only set if there are measured samples (missing ones are NaN)
+    if np.isfinite(ramp_measurements).any():
+        ax.set_ylim(np.nanmin(ramp_measurements), np.nanmax(ramp_measurements))
 
-    ax.xaxis.set_major_formatter(FormatStrFormatter('% 1.1f'))
-   
     ax.set_title("Vin Vs Vout")
 
-    ax.set_xlabel("Time [S]", fontsize=16)
+    ax.set_xlabel("Time [ms]", fontsize=16)
     ax.set_ylabel("Voltage [V]", fontsize=16)
 
-    ax.plot(Times, ramp_measurements,label='V_in', color = 'blue', linewidth = 1)
-    ax.plot(Times, opamp_measurements,label='V_out', color = 'orange', linewidth = 1)
+    ax.plot(Times[::step] * 1e3, ramp_measurements[::step],label='V_in', color = 'blue', linewidth = 1)
+    ax.plot(Times[::step] * 1e3, opamp_measurements[::step],label='V_out', color = 'orange', linewidth = 1)
 
     ax.legend(fontsize=10, fancybox=False, edgecolor='black', bbox_to_anchor =(1.1, 1))
 
 
     ax = axis[1]
 
-    ax.set_xlim(0, max(ramp_measurements))
-    ax.set_ylim(min(opamp_measurements), max(opamp_measurements))
+    if np.isfinite(ramp_measurements).any():
+        ax.set_xlim(0, np.nanmax(ramp_measurements))
+    if np.isfinite(opamp_measurements).any():
+        ax.set_ylim(np.nanmin(opamp_measurements), np.nanmax(opamp_measurements))
 
     ax.xaxis.set_major_formatter(FormatStrFormatter('% 1.1f'))
    
@@ -393,18 +479,83 @@ def main():
     ax.set_xticks(np.linspace(0,5,20))
     ax.set_yticks(np.linspace(-5,5,10))
 
-    ax.plot(ramp_measurements, opamp_measurements,label='V_out', color = 'green', linewidth = 1)
+    ax.plot(ramp_measurements[::step], opamp_measurements[::step],label='V_out', color = 'green', linewidth = 1)
 
     ax.legend(fontsize=10, fancybox=False, edgecolor='black', bbox_to_anchor =(1.1, 1))
 
     fig.tight_layout()
     plt.show()
+    return
 
-    close_function(device_data, channel = 1)
-    close_oscilloscope(device_data)
-    close(device_data)
+def main():
+
+    power_up = -5
+    amplitude = 5
+    amplitude_slope = 0.05
+    rmap_steps = round(amplitude/amplitude_slope)
+    time_per_measurement = 1e-6
+    cycles = 1
 
-    data = [(Times[i], ramp_measurements[i], opamp_measurements[i]) for i in range(0, len(Times), 1)]
+    fliped = False
+
+    # connect to the device
+    device_data = device.open()
+    time.sleep(0.5)
+
+    #open_oscilloscope
+    open_oscilloscope(device_data)
+
+    _switch_variable_(device_data = device_data, master_state = True, positive_state = True, negative_state = True, positive_voltage = 5, negative_voltage = -5)
+    time.sleep(0.5)
+
+    print("starting")
+
+    # Setup function generater
+    generate_function(device_data = device_data, channel = 1, function = function.dc, offset = power_up, frequency=0, amplitude=0)
+    time.sleep(0.5)
+
+    # stop the wavegen, so only the start of the ramp can trigger the recording (not the settings loaded before it)
+    stop_function(device_data, channel = 1)
+
+    # one cycle of the sweep: ramp up from power_up to the amplitude, then back down
+    # every voltage is computed from its step index, so the steps are exactly amplitude_slope and do not accumulate rounding errors
+    ramp_up = np.linspace(power_up, amplitude, rmap_steps*2, endpoint=False)
+    ramp_down = np.linspace(amplitude, power_up, rmap_steps*2, endpoint=False)
+    ramp = np.concatenate([ramp_up, ramp_down])
+
+    # record both channels during the whole sweep, one sample per step, starting together with the wavegen
+    sample_count = len(ramp) * cycles
+    ramp_measurements = np.empty(sample_count, dtype=np.float64)
+    opamp_measurements = np.empty(sample_count, dtype=np.float64)
+    sampling_frequency = start_recording(device_data, sampling_frequency = 1 / time_per_measurement, sample_count = sample_count, trigger_source = constants.trigsrcAnalogOut1)
+
+    #begin timer
+    start_ns = time.perf_counter_ns()
+
+    # the device is reset and closed even if the recording or the plot fails
+    try:
+        # upload the ramp once, the wavegen steps through it on its own (custom samples are normalized to the amplitude)
+        generate_function(device_data = device_data, channel = 1, function = function.custom, offset = 0, frequency = 1 / (len(ramp) * time_per_measurement), amplitude = amplitude, data = ramp / amplitude)
+
+        # copy the recorded ramp (channel 1) and op-amp output (channel 2) voltages
+        received_count = read_recording(device_data, ramp_measurements, opamp_measurements)
+        elapsed = (time.perf_counter_ns() - start_ns) / 1e9
+        print(f"Sweep Time:{elapsed}")
+
+        # time moment of each sample in seconds
+        Times = np.arange(sample_count, dtype=np.float64) / sampling_frequency
+
+        if received_count > 0:
+            plot_measurements(Times, ramp_measurements, opamp_measurements)
+        else:
+            print("Nothing to plot, no samples were recorded")
+    finally:
+        close_function(device_data, channel = 1)
+        close_oscilloscope(device_data)
+        close(device_data)
+
+    # one row per sample: time, V_in, V_out
+    data = np.column_stack((Times, ramp_measurements, opamp_measurements))
     print(data)
 
 if __name__ == "__main__":